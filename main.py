@@ -1,11 +1,24 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+import orjson
 import yfinance as yf
+import asyncio
 from datetime import datetime
+import numpy as np
 import pandas as pd
 from typing import Dict, List
 import logging
 import os
+import threading
+import functools
+import httpx
+import redis.asyncio
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache, cached
 
 # 配置日誌
 logging.basicConfig(level=logging.INFO)
@@ -14,7 +27,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="FinTech Monitor API",
     version="1.0.0",
-    description="金融市場監控 API"
+    description="金融市場監控 API",
+    default_response_class=ORJSONResponse
 )
 
 # 配置 CORS - 允許所有來源
@@ -26,6 +40,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 壓縮回應 - JSON 欄位名高度重複，gzip 可省 5-10 倍傳輸量
+app.add_middleware(GZipMiddleware, minimum_size=512)
+
 # 數據代號配置
 TICKERS = {
     "us10y": "^TNX",
@@ -34,12 +51,126 @@ TICKERS = {
     "oil": "CL=F"
 }
 
+# 共用 HTTP Session - keep-alive 連線池省掉每次抓取的 TCP + TLS 握手
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.3)
+))
+
+# In-process TTL 快取 - 60 秒內重複請求直接回傳快取的 DataFrame，不再打 Yahoo
+# （多 worker 部署時可改用 Redis 後端，key 不變）
+TICKER_DATA_CACHE = TTLCache(maxsize=64, ttl=60)
+CACHE_LOCK = threading.Lock()
+
+# Redis 回應快取 - 多 replica 部署共用、冷啟動不再重付 Yahoo 延遲；未設 REDIS_URL 時自動停用
+REDIS_URL = os.environ.get("REDIS_URL")
+REDIS = redis.asyncio.Redis.from_url(REDIS_URL) if REDIS_URL else None
+
+def redis_cached(endpoint: str, ttl: int = 60):
+    """以 (endpoint, period) 為 key 將回應 bytes 快取到 Redis"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(period: str = "5d"):
+            if REDIS is None:
+                return await func(period)
+
+            key = f"cache:{endpoint}:{period}"
+            lock_key = f"lock:{key}"
+            try:
+                body = await REDIS.get(key)
+                if body is not None:
+                    return Response(content=body, media_type="application/json")
+
+                # SET NX 鎖 - 快取失效瞬間只讓一個請求重算，其餘輪詢等結果（防 thundering herd）
+                have_lock = await REDIS.set(lock_key, b"1", nx=True, ex=5)
+                if not have_lock:
+                    for _ in range(25):
+                        await asyncio.sleep(0.2)
+                        body = await REDIS.get(key)
+                        if body is not None:
+                            return Response(content=body, media_type="application/json")
+            except redis.RedisError as e:
+                logger.error(f"Redis cache error for {key}: {str(e)}")
+                return await func(period)
+
+            response = await func(period)
+            try:
+                if response.status_code == 200:
+                    await REDIS.set(key, response.body, ex=ttl)
+                await REDIS.delete(lock_key)
+            except redis.RedisError as e:
+                logger.error(f"Redis cache store error for {key}: {str(e)}")
+            return response
+        return wrapper
+    return decorator
+
+# 共用 AsyncClient - HTTP/2 多工讓四個 chart 請求共用同一條連線
+CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+CLIENT = httpx.AsyncClient(
+    http2=True,
+    timeout=10,
+    limits=httpx.Limits(max_keepalive_connections=20),
+    headers={"User-Agent": "Mozilla/5.0"}
+)
+
+async def fetch_chart(symbol: str, period: str = "5d") -> pd.DataFrame:
+    """直接呼叫 Yahoo v8 chart API 抓取日線 OHLC（非阻塞，結果快取 60 秒）"""
+    with CACHE_LOCK:
+        hist = TICKER_DATA_CACHE.get((symbol, period))
+    if hist is not None:
+        return hist
+
+    logger.info(f"Fetching {symbol} chart for period {period}")
+    resp = await CLIENT.get(
+        CHART_URL.format(symbol=symbol),
+        params={"range": period, "interval": "1d"}
+    )
+    resp.raise_for_status()
+    result = resp.json()["chart"]["result"][0]
+    quote = result["indicators"]["quote"][0]
+    hist = pd.DataFrame(
+        {
+            "Open": np.asarray(quote["open"], dtype=np.float64),
+            "High": np.asarray(quote["high"], dtype=np.float64),
+            "Low": np.asarray(quote["low"], dtype=np.float64),
+            "Close": np.asarray(quote["close"], dtype=np.float64)
+        },
+        index=pd.to_datetime(result["timestamp"], unit="s", utc=True)
+    ).dropna(how="all")
+
+    if hist.empty:
+        logger.warning(f"No data returned for {symbol}")
+        raise ValueError(f"No data for {symbol}")
+
+    logger.info(f"Successfully fetched {len(hist)} records for {symbol}")
+    with CACHE_LOCK:
+        TICKER_DATA_CACHE[(symbol, period)] = hist
+    return hist
+
+# 跨請求重用 Ticker 物件，避免重複建構並保留 yfinance 內部快取
+TICKER_CACHE: Dict[str, yf.Ticker] = {}
+
+@app.on_event("startup")
+async def init_ticker_cache():
+    """啟動時預建所有 Ticker 物件"""
+    for symbol in TICKERS.values():
+        TICKER_CACHE[symbol] = yf.Ticker(symbol, session=SESSION)
+    logger.info(f"Initialized ticker cache for {list(TICKER_CACHE)}")
+
+@cached(cache=TICKER_DATA_CACHE, key=lambda ticker, period="5d": (ticker, period), lock=CACHE_LOCK)
 def fetch_ticker_data(ticker: str, period: str = "5d") -> pd.DataFrame:
-    """抓取 ticker 數據"""
+    """抓取單一 ticker 數據（yfinance 備援路徑；結果以 (ticker, period) 為 key 快取 60 秒）"""
     try:
         logger.info(f"Fetching {ticker} data for period {period}")
-        data = yf.Ticker(ticker)
-        hist = data.history(period=period)
+        data = TICKER_CACHE.get(ticker)
+        if data is None:
+            data = TICKER_CACHE[ticker] = yf.Ticker(ticker, session=SESSION)
+        # 明確指定日線並只留用到的欄位，避免細粒度 K 棒與 Volume/Dividends 等多餘欄位
+        hist = data.history(
+            period=period, interval="1d", auto_adjust=False, actions=False
+        )[["Open", "High", "Low", "Close"]]
         
         if hist.empty:
             logger.warning(f"No data returned for {ticker}")
@@ -51,10 +182,66 @@ def fetch_ticker_data(ticker: str, period: str = "5d") -> pd.DataFrame:
         logger.error(f"Error fetching {ticker}: {str(e)}")
         raise
 
+def ensure_chronological(hist: pd.DataFrame) -> pd.DataFrame:
+    """確保 DataFrame 按日期遞增排序（yfinance 回傳通常已排序，僅防禦性檢查）"""
+    if not hist.index.is_monotonic_increasing:
+        return hist.sort_index()
+    return hist
+
+def df_to_records(df: pd.DataFrame, mapping: Dict) -> List[Dict]:
+    """依欄位對應表將 DataFrame 轉換為記錄列表（純序列化，不做 I/O）
+
+    mapping: 輸出欄位名 -> (來源欄位名或 ndarray, 小數位數)。
+    日期一次 strftime、每欄一次 np.round，逐列只剩 zip + dict 組裝；
+    numpy 純量直接交給 orjson（OPT_SERIALIZE_NUMPY）編碼，省掉逐格 float() 裝箱。
+    """
+    df = ensure_chronological(df)
+    dates = df.index.strftime("%Y-%m-%d").tolist()
+    arrays = []
+    for source, digits in mapping.values():
+        # 來源欄位先複製再原地 round（out=），不改動快取中的 DataFrame 也不多配置一份陣列；
+        # 傳入的計算結果陣列本身就是新配置，直接原地 round
+        values = df[source].to_numpy(copy=True) if isinstance(source, str) else source
+        arrays.append(np.round(values, digits, out=values))
+    fields = ("date", *mapping)
+    return [dict(zip(fields, values)) for values in zip(dates, *arrays)]
+
+def build_spread_data(us_data: pd.DataFrame, jp_yield: float = 1.0) -> List[Dict]:
+    """將美債 DataFrame 轉換為利差記錄（日債為固定值，全程純 NumPy 運算）"""
+    us_data = ensure_chronological(us_data)
+    dates = us_data.index.strftime("%Y-%m-%d").tolist()
+    us = us_data['Close'].to_numpy(dtype=np.float64, copy=True)
+    np.round(us, 4, out=us)
+    spreads = us - jp_yield
+    np.round(spreads, 4, out=spreads)
+    # jp10y 為常數不需整欄陣列；.tolist() 單次 C 轉換，比逐格裝箱 numpy 純量快
+    jp10y = round(jp_yield, 4)
+    return [
+        {"date": date, "us10y": us_yield, "jp10y": jp10y, "spread": spread}
+        for date, us_yield, spread in zip(dates, us.tolist(), spreads.tolist())
+    ]
+
+def build_fx_data(hist: pd.DataFrame) -> List[Dict]:
+    """將匯率 DataFrame 轉換為記錄"""
+    return df_to_records(hist, {
+        "rate": ("Close", 4),
+        "high": ("High", 4),
+        "low": ("Low", 4)
+    })
+
+def build_commodity_data(hist: pd.DataFrame) -> List[Dict]:
+    """將商品 DataFrame 轉換為記錄"""
+    hist = ensure_chronological(hist)
+    changes = hist['Close'].to_numpy() - hist['Open'].to_numpy()
+    return df_to_records(hist, {
+        "price": ("Close", 2),
+        "change": (changes, 2)
+    })
+
 @app.get("/")
 async def root():
     """根路徑 - API 資訊"""
-    return {
+    return ORJSONResponse({
         "message": "FinTech Monitor API",
         "version": "1.0.0",
         "status": "running",
@@ -63,89 +250,120 @@ async def root():
             "health": "/health",
             "bond_spread": "/api/bond-spread",
             "fx": "/api/fx",
+            "fx_ndjson": "/api/fx.ndjson",
             "commodities": "/api/commodities",
             "all": "/api/all"
         }
-    }
+    })
 
 @app.get("/health")
 async def health_check():
     """健康檢查"""
-    return {
+    return ORJSONResponse({
         "status": "healthy",
         "timestamp": datetime.now().isoformat()
-    }
+    })
+
+@app.post("/api/cache/flush")
+async def flush_cache():
+    """清空 ticker 數據快取（管理用）"""
+    with CACHE_LOCK:
+        TICKER_DATA_CACHE.clear()
+    if REDIS is not None:
+        try:
+            async for key in REDIS.scan_iter(match="cache:*"):
+                await REDIS.delete(key)
+        except redis.RedisError as e:
+            logger.error(f"Redis cache flush error: {str(e)}")
+    logger.info("Ticker data caches flushed")
+    return ORJSONResponse({
+        "success": True,
+        "timestamp": datetime.now().isoformat()
+    })
 
 @app.get("/api/bond-spread")
+@redis_cached("bond-spread", ttl=60)
 async def get_bond_spread(period: str = "5d"):
     """獲取美日利差數據"""
     try:
         logger.info(f"API /api/bond-spread called with period={period}")
         
         # 抓取美債數據
-        us_data = fetch_ticker_data(TICKERS["us10y"], period)
+        us_data = await fetch_chart(TICKERS["us10y"], period)
         
         # 日債使用固定值（yfinance 沒有準確的日債數據）
-        jp_yield = 1.0
-        
-        spread_data = []
-        for date, row in us_data.iterrows():
-            us_yield = float(row['Close'])
-            spread_data.append({
-                "date": date.strftime("%Y-%m-%d"),
-                "us10y": round(us_yield, 4),
-                "jp10y": round(jp_yield, 4),
-                "spread": round(us_yield - jp_yield, 4)
-            })
-        
+        spread_data = build_spread_data(us_data)
+
         logger.info(f"Successfully calculated {len(spread_data)} spread records")
-        
-        return {
+
+        return ORJSONResponse({
             "success": True,
-            "data": sorted(spread_data, key=lambda x: x['date']),
+            "data": spread_data,
             "metadata": {
                 "period": period,
                 "data_points": len(spread_data),
                 "last_update": datetime.now().isoformat()
             }
-        }
+        })
     except Exception as e:
         logger.error(f"Bond spread error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/fx")
+@redis_cached("fx", ttl=60)
 async def get_fx_rate(period: str = "5d"):
     """獲取美日匯率數據"""
     try:
         logger.info(f"API /api/fx called with period={period}")
         
-        hist = fetch_ticker_data(TICKERS["jpy_fx"], period)
-        
-        fx_data = []
-        for date, row in hist.iterrows():
-            fx_data.append({
-                "date": date.strftime("%Y-%m-%d"),
-                "rate": round(float(row['Close']), 4),
-                "high": round(float(row['High']), 4),
-                "low": round(float(row['Low']), 4)
-            })
-        
+        hist = await fetch_chart(TICKERS["jpy_fx"], period)
+
+        fx_data = build_fx_data(hist)
+
         logger.info(f"Successfully fetched {len(fx_data)} FX records")
-        
-        return {
+
+        return ORJSONResponse({
             "success": True,
-            "data": sorted(fx_data, key=lambda x: x['date']),
+            "data": fx_data,
             "metadata": {
                 "pair": "USD/JPY",
                 "period": period,
                 "last_update": datetime.now().isoformat()
             }
-        }
+        })
     except Exception as e:
         logger.error(f"FX rate error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/fx.ndjson")
+async def get_fx_rate_ndjson(period: str = "5d"):
+    """以 NDJSON 逐筆串流美日匯率數據（長週期免一次性組裝整個列表）"""
+    try:
+        logger.info(f"API /api/fx.ndjson called with period={period}")
+
+        hist = ensure_chronological(await fetch_chart(TICKERS["jpy_fx"], period))
+        dates = hist.index.strftime("%Y-%m-%d").tolist()
+        closes = hist['Close'].to_numpy(copy=True)
+        highs = hist['High'].to_numpy(copy=True)
+        lows = hist['Low'].to_numpy(copy=True)
+        np.round(closes, 4, out=closes)
+        np.round(highs, 4, out=highs)
+        np.round(lows, 4, out=lows)
+
+        def generate():
+            for date, close, high, low in zip(dates, closes, highs, lows):
+                yield orjson.dumps(
+                    {"date": date, "rate": close, "high": high, "low": low},
+                    option=orjson.OPT_SERIALIZE_NUMPY
+                ) + b"\n"
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+    except Exception as e:
+        logger.error(f"FX NDJSON error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/commodities")
+@redis_cached("commodities", ttl=60)
 async def get_commodities(period: str = "5d"):
     """獲取大宗商品數據"""
     try:
@@ -155,71 +373,74 @@ async def get_commodities(period: str = "5d"):
         
         # 黃金
         try:
-            gold_hist = fetch_ticker_data(TICKERS["gold"], period)
-            gold_data = []
-            for date, row in gold_hist.iterrows():
-                gold_data.append({
-                    "date": date.strftime("%Y-%m-%d"),
-                    "price": round(float(row['Close']), 2),
-                    "change": round(float(row['Close'] - row['Open']), 2)
-                })
-            commodities["gold"] = sorted(gold_data, key=lambda x: x['date'])
-            logger.info(f"Successfully fetched {len(gold_data)} gold records")
+            gold_hist = await fetch_chart(TICKERS["gold"], period)
+            commodities["gold"] = build_commodity_data(gold_hist)
+            logger.info(f"Successfully fetched {len(commodities['gold'])} gold records")
         except Exception as e:
             logger.error(f"Gold data error: {str(e)}")
             commodities["gold"] = []
-        
+
         # 原油
         try:
-            oil_hist = fetch_ticker_data(TICKERS["oil"], period)
-            oil_data = []
-            for date, row in oil_hist.iterrows():
-                oil_data.append({
-                    "date": date.strftime("%Y-%m-%d"),
-                    "price": round(float(row['Close']), 2),
-                    "change": round(float(row['Close'] - row['Open']), 2)
-                })
-            commodities["oil"] = sorted(oil_data, key=lambda x: x['date'])
-            logger.info(f"Successfully fetched {len(oil_data)} oil records")
+            oil_hist = await fetch_chart(TICKERS["oil"], period)
+            commodities["oil"] = build_commodity_data(oil_hist)
+            logger.info(f"Successfully fetched {len(commodities['oil'])} oil records")
         except Exception as e:
             logger.error(f"Oil data error: {str(e)}")
             commodities["oil"] = []
-        
-        return {
+
+        return ORJSONResponse({
             "success": True,
             "data": commodities,
             "metadata": {
                 "period": period,
                 "last_update": datetime.now().isoformat()
             }
-        }
+        })
     except Exception as e:
         logger.error(f"Commodities error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/all")
+@redis_cached("all", ttl=60)
 async def get_all_data(period: str = "5d"):
     """一次性獲取所有數據"""
     try:
         logger.info(f"API /api/all called with period={period}")
-        
-        # 分別獲取各項數據
-        bond_spread_result = await get_bond_spread(period)
-        fx_result = await get_fx_rate(period)
-        commodities_result = await get_commodities(period)
-        
-        return {
+
+        # 並行抓取四個 chart（HTTP/2 共用連線，總延遲 ≈ 最慢的一個）
+        us_hist, fx_hist, gold_hist, oil_hist = await asyncio.gather(
+            *(fetch_chart(TICKERS[key], period)
+              for key in ("us10y", "jpy_fx", "gold", "oil")),
+            return_exceptions=True
+        )
+
+        # 美債與匯率失敗視為整體失敗；商品失敗回傳空列表（與 /api/commodities 行為一致）
+        if isinstance(us_hist, Exception):
+            raise us_hist
+        if isinstance(fx_hist, Exception):
+            raise fx_hist
+
+        commodities = {}
+        for name, hist in (("gold", gold_hist), ("oil", oil_hist)):
+            if isinstance(hist, Exception):
+                logger.error(f"{name.capitalize()} data error: {str(hist)}")
+                commodities[name] = []
+            else:
+                commodities[name] = build_commodity_data(hist)
+
+        return ORJSONResponse({
             "success": True,
             "data": {
-                "bondSpread": bond_spread_result["data"],
-                "fx": fx_result["data"],
-                "commodities": commodities_result["data"]
+                "bondSpread": build_spread_data(us_hist),
+                "fx": build_fx_data(fx_hist),
+                "commodities": commodities
             },
             "metadata": {
                 "period": period,
                 "last_update": datetime.now().isoformat()
             }
-        }
+        })
     except Exception as e:
         logger.error(f"All data error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -227,4 +448,12 @@ async def get_all_data(period: str = "5d"):
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # uvloop + httptools：C 實作的事件迴圈與 HTTP 解析器；workers 數由環境變數控制
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.environ.get("WEB_CONCURRENCY", 2))
+    )